@@ -1,8 +1,14 @@
+import asyncio
+from collections import OrderedDict
+import functools
+import html
 import importlib.resources
+import json
 import logging
 import os
+import re
 import secrets
-from typing import Any, Literal
+from typing import Any, Callable, Iterable, Literal
 from pydantic import BaseModel, TypeAdapter, ValidationError
 
 from rxxxt.asgi import ASGIFnReceive, ASGIFnSend, ASGIScope, HTTPContext, WebsocketContext
@@ -12,19 +18,34 @@ from rxxxt.helpers import PathPattern, to_awaitable
 from rxxxt.page import Page, PageFactory
 from rxxxt.state import JWTStateResolver, StateResolver, StateResolverError
 
+try: import re2 as _route_re # optional: linear-time matching for large route tables
+except ImportError: _route_re = re
+
 class AppHttpRequest(BaseModel):
   stateToken: str
   events: list[ContextInputEvent]
 
-class AppHttpResultBase(BaseModel):
-  stateToken: str
-  events: list[ExecutionOutputEvent]
-
-class AppInitData(AppHttpResultBase):
-  path: str
-
-class AppHttpPostResponse(AppHttpResultBase):
-  html_parts: list[str]
+  @classmethod
+  def parse(cls, raw: str | bytes) -> 'AppHttpRequest':
+    data = json.loads(raw)
+    state_token = data.get("stateToken", None)
+    if not isinstance(state_token, str): raise ValueError("Invalid state token!")
+    return cls.model_construct(stateToken=state_token, events=_parse_input_events(data.get("events", None)))
+
+def _dump_json(data: Any) -> str: return json.dumps(data, separators=(",", ":"))
+def _dump_output_events(events: Iterable[ExecutionOutputEvent]) -> list[dict[str, Any]]:
+  # the fixed-shape events are dumped by hand; only set-cookie goes through pydantic serialization
+  out: list[dict[str, Any]] = []
+  for e in events:
+    if e.event == "navigate": out.append({ "location": e.location, "event": "navigate" })
+    elif e.event == "force-refresh": out.append({ "event": "force-refresh" })
+    elif e.event == "use-websocket": out.append({ "event": "use-websocket", "websocket": e.websocket })
+    else: out.append(e.model_dump(mode="json"))
+  return out
+
+def _parse_input_events(events: Any) -> list[ContextInputEvent]:
+  if not isinstance(events, list): raise ValueError("Invalid events!")
+  return [ContextInputEvent.model_validate(e) for e in events]
 
 class AppWebsocketInitMessage(BaseModel):
   type: Literal["init"]
@@ -36,54 +57,83 @@ class AppWebsocketUpdateMessage(BaseModel):
   events: list[ContextInputEvent]
   location: str
 
-  @property
-  def path(self): return self.location.split("?")[0]
+  @classmethod
+  def parse(cls, message: str | bytes) -> 'AppWebsocketUpdateMessage':
+    # json.loads + model_construct is much cheaper than full model validation on the per-frame path
+    data = json.loads(message)
+    location = data.get("location", None)
+    if data.get("type", None) != "update" or not isinstance(location, str): raise ValueError("Invalid update message!")
+    return cls.model_construct(type="update", events=_parse_input_events(data.get("events", None)), location=location)
+
+  @functools.cached_property
+  def _location_parts(self):
+    path, sep, query = self.location.partition("?")
+    return path, (query if sep else None)
 
   @property
-  def query_string(self):
-    parts = self.location.split("?")
-    return parts[1] if len(parts) > 1 else None
+  def path(self): return self._location_parts[0]
 
-class AppWebsocketResponseMessage(BaseModel):
-  stateToken: str | None = None
-  events: list[ExecutionOutputEvent]
-  html_parts: list[str]
-  end: bool
+  @property
+  def query_string(self): return self._location_parts[1]
 
 RawStateAdapter = TypeAdapter(dict[str, str])
 
+# apps see few distinct paths, so the derived route context key is worth memoizing
+_route_context_key = functools.lru_cache(maxsize=1024)(AppExecution.get_hashed_id)
+
 class Router(ElementFactory):
   class RoutedElement(Element):
-    def __init__(self, routes: list[tuple[PathPattern, ElementFactory]]):
-      self._routes = routes
+    __slots__ = ("_resolve",)
 
-    async def to_html(self, context: Context):
-      element = self._get_element(context.path)
-      return await element.to_html(context.sub(AppExecution.get_hashed_id(context.path)))
+    def __init__(self, resolve: 'Callable[[str], ElementFactory | None]'):
+      self._resolve = resolve
 
-    def _get_element(self, path: str):
-      for pattern, element_factory in self._routes:
-        if pattern.match(path) is not None:
-          return element_factory() # TODO: provide match as context
-      return El.h1(content=["Not found!"])
+    async def to_html(self, context: Context):
+      factory = self._resolve(context.path)
+      element = factory() if factory is not None else El.h1(content=["Not found!"]) # TODO: provide match as context
+      return await element.to_html(context.sub(_route_context_key(context.path)))
 
   def __init__(self) -> None:
     self._routes: list[tuple[PathPattern, ElementFactory]] = []
+    self._resolver: Callable[[str], ElementFactory | None] | None = None
 
-  def add_route(self, path: str, element_factory: ElementFactory): self._routes.append((PathPattern(path), element_factory))
+  def add_route(self, path: str, element_factory: ElementFactory):
+    self._routes.append((PathPattern(path), element_factory))
+    self._resolver = None
   def route(self, path: str):
     def _inner(fn: ElementFactory):
       self.add_route(path, fn)
       return fn
     return _inner
 
-  def __call__(self) -> Element: return Router.RoutedElement(self._routes)
+  def _get_resolver(self):
+    if self._resolver is None:
+      # one combined alternation so route dispatch is a single regex match regardless of route count,
+      # plus a bounded memo so repeat paths skip matching entirely
+      routes = list(self._routes)
+      matcher = _route_re.compile("|".join(f"(?P<r{i}>{pattern.as_regex()})" for i, (pattern, _) in enumerate(routes))) if len(routes) > 0 else None
+      @functools.lru_cache(maxsize=1024)
+      def _resolve(path: str) -> ElementFactory | None:
+        if matcher is None: return None
+        m = matcher.match(path)
+        if m is None or m.lastgroup is None: return None
+        return routes[int(m.lastgroup[1:])][1]
+      self._resolver = _resolve
+    return self._resolver
+
+  def __call__(self) -> Element: return Router.RoutedElement(self._get_resolver())
 
 class App:
   def __init__(self, content: ElementFactory, state_resolver: StateResolver | None = None, page_layout: PageFactory | None = None, app_data: dict[str, Any] = {}) -> None:
     self.content = content
     self.page_layout: PageFactory = page_layout or Page
     self.app_data = app_data
+    # the page header is fully static and the init script only varies by its JSON payload
+    self._header_el = HTMLFragment([ El.script(src="/rxxxt-client.js"), El.style(content=["rxxxt-meta { display: contents; }"]) ])
+    self._init_script_prefix = "<script>window.rxxxt.init("
+    self._init_script_suffix = ");</script>"
+    self._token_state_cache: OrderedDict[str, dict[str, str]] = OrderedDict()
+    self._token_state_cache_size = 1024
     if state_resolver is None:
       jwt_secret = os.getenv("JWT_SECRET", None)
       if jwt_secret is None: jwt_secret = secrets.token_bytes(64)
@@ -118,47 +168,64 @@ class App:
 
     init_message = AppWebsocketInitMessage.model_validate_json(message)
     last_state_token = init_message.stateToken
-    executor = AppExecutor(await self._get_state_from_token(last_state_token), context.headers)
-
-    while not closing:
-      typ, message = await context.receive()
-      if typ == "disconnect" or typ == "connect": return
-
-      update_message = AppWebsocketUpdateMessage.model_validate_json(message)
-
-      html_output, execution = await executor.execute_root("content", self._render_content(), ExecutionInput(
-        events=update_message.events,
-        path=update_message.path,
-        query_string=update_message.query_string
-      ))
-
-      output_events: list[ExecutionOutputEvent] = []
-      for event in execution.output_events:
-        if event.event == "use-websocket":
-          if not event.websocket: closing = True
-        else: output_events.append(event)
-
-      if len(update_message.events) > 0:
-        if len(output_events) > 0: output_events.append(ForceRefreshOutputEvent())
-        else:
-          html_output, execution = await executor.execute_root("content", self._render_content(), ExecutionInput(
-            events=[],
-            path=context.path,
-            query_string=context.query_string
-          ))
-          output_events = execution.output_events
-
-      state_token: str | None = None
-      if init_message.enableStateUpdates or closing:
-        state_token = await self._create_state_token(executor.get_raw_state(), last_state_token)
-        last_state_token = state_token
+    last_state = await self._get_state_from_token(last_state_token)
+    executor = AppExecutor(last_state, context.headers)
+
+    receive_task = asyncio.ensure_future(context.receive())
+    try:
+      while not closing:
+        typ, message = await receive_task
+        receive_task = asyncio.ensure_future(context.receive())
+        if typ == "disconnect" or typ == "connect": return
+
+        update_message = AppWebsocketUpdateMessage.parse(message)
+        events = list(update_message.events)
+
+        # coalesce updates the client has already queued into one render and one response frame
+        while True:
+          done, _ = await asyncio.wait({ receive_task }, timeout=0)
+          if len(done) == 0: break
+          typ, message = receive_task.result()
+          receive_task = asyncio.ensure_future(context.receive())
+          if typ == "disconnect" or typ == "connect": return
+          update_message = AppWebsocketUpdateMessage.parse(message)
+          events.extend(update_message.events)
+
+        html_output, execution = await executor.execute_root("content", self._render_content(), ExecutionInput(
+          events=events,
+          path=update_message.path,
+          query_string=update_message.query_string
+        ))
 
-      await context.send_message(AppWebsocketResponseMessage(
-        events=output_events,
-        html_parts=[html_output],
-        stateToken=state_token,
-        end=True
-      ).model_dump_json())
+        if any(e.event == "use-websocket" and not e.websocket for e in execution.output_events): closing = True
+        output_events: list[ExecutionOutputEvent] = [ e for e in execution.output_events if e.event != "use-websocket" ]
+
+        if len(events) > 0:
+          if len(output_events) > 0: output_events.append(ForceRefreshOutputEvent())
+          elif executor.has_state_changes():
+            # handlers may have mutated state used by components rendered before them
+            html_output, execution = await executor.execute_root("content", self._render_content(), ExecutionInput(
+              events=[],
+              path=context.path,
+              query_string=context.query_string
+            ))
+            output_events = execution.output_events
+
+        state_token: str | None = None
+        if init_message.enableStateUpdates or closing:
+          raw_state = executor.get_raw_state()
+          if raw_state == last_state: state_token = last_state_token # unchanged state - skip re-signing
+          else:
+            state_token = await self._create_state_token(raw_state, last_state_token)
+            last_state_token, last_state = state_token, raw_state
+
+        await context.send_message(_dump_json({
+          "stateToken": state_token,
+          "events": _dump_output_events(output_events),
+          "html_parts": [html_output],
+          "end": True
+        }))
+    finally: receive_task.cancel()
 
   async def _handle_http(self, context: HTTPContext):
     if context.path == "/rxxxt-client.js":
@@ -167,7 +234,7 @@ class App:
     elif context.method in [ "GET", "POST" ]:
       old_state_token: str | None = None
       if context.method == "POST":
-        req = AppHttpRequest.model_validate_json(await context.receive_json_raw())
+        req = AppHttpRequest.parse(await context.receive_json_raw())
         old_state_token = req.stateToken
         state, events = await self._get_state_from_token(req.stateToken), req.events
       else: state, events={}, []
@@ -179,15 +246,14 @@ class App:
         query_string=context.query_string
       ))
 
-      output_events: list[ExecutionOutputEvent] = []
       for event in execution.output_events:
         if event.event == "set-cookie": context.add_response_headers([(b"Set-Cookie", event.to_set_cookie_header().encode("utf-8"))])
-        elif event.event == "use-websocket" and not event.websocket: pass
-        else: output_events.append(event)
+      output_events: list[ExecutionOutputEvent] = [
+        e for e in execution.output_events if e.event != "set-cookie" and (e.event != "use-websocket" or e.websocket) ]
 
       if len(events) > 0:
         if len(output_events) > 0: output_events.append(ForceRefreshOutputEvent())
-        else:
+        elif executor.has_state_changes():
           html_output, execution = await executor.execute_root("content", self._render_content(), ExecutionInput(
             events=[],
             path=context.path,
@@ -195,19 +261,21 @@ class App:
           ))
           output_events = execution.output_events
 
-      state_token = await self._create_state_token(executor.get_raw_state(), old_state_token)
+      raw_state = executor.get_raw_state()
+      if old_state_token is not None and raw_state == state: state_token = old_state_token # unchanged state - skip re-signing
+      else: state_token = await self._create_state_token(raw_state, old_state_token)
 
       if context.method == "POST":
-        await context.respond_json_string(AppHttpPostResponse(
-          stateToken=state_token,
-          events=output_events,
-          html_parts=[html_output]
-        ).model_dump_json())
+        await context.respond_json_string(_dump_json({
+          "stateToken": state_token,
+          "events": _dump_output_events(output_events),
+          "html_parts": [html_output]
+        }))
       else:
-        header_el = HTMLFragment([ El.script(src="/rxxxt-client.js"), El.style(content=["rxxxt-meta { display: contents; }"]) ])
-        body_end_el = HTMLFragment([ El.script(content=[ f"window.rxxxt.init({AppInitData(stateToken=state_token, events=output_events, path=context.path).model_dump_json()});" ]) ])
+        init_data = _dump_json({ "stateToken": state_token, "events": _dump_output_events(output_events), "path": context.path })
+        body_end_el = UnescapedHTMLElement(self._init_script_prefix + html.escape(init_data, quote=False) + self._init_script_suffix)
         content_el = UnescapedHTMLElement(html_output)
-        page_html, _ = await executor.execute_root("page", self.page_layout(header_el, content_el, body_end_el), ExecutionInput(
+        page_html, _ = await executor.execute_root("page", self.page_layout(self._header_el, content_el, body_end_el), ExecutionInput(
           events=[],
           path=context.path,
           query_string=context.query_string
@@ -218,8 +286,21 @@ class App:
   def _render_content(self): return El["rxxxt-meta"](id="rxxxt-root", content=[self.content()])
 
   async def _create_state_token(self, state: dict[str, str], old_token: str | None):
-    return await to_awaitable(self.state_resolver.create_token, state, old_token)
+    token = await to_awaitable(self.state_resolver.create_token, state, old_token)
+    self._cache_token_state(token, state)
+    return token
 
   async def _get_state_from_token(self, token: str) -> dict[str, str]:
-    try: return RawStateAdapter.validate_python(await to_awaitable(self.state_resolver.resolve, token))
+    state = self._token_state_cache.get(token, None)
+    if state is not None:
+      self._token_state_cache.move_to_end(token)
+      return state
+    try: state = RawStateAdapter.validate_python(await to_awaitable(self.state_resolver.resolve, token))
     except StateResolverError: return {}
+    self._cache_token_state(token, state)
+    return state
+
+  def _cache_token_state(self, token: str, state: dict[str, str]):
+    self._token_state_cache[token] = state
+    self._token_state_cache.move_to_end(token)
+    while len(self._token_state_cache) > self._token_state_cache_size: self._token_state_cache.popitem(last=False)
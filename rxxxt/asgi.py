@@ -1,5 +1,4 @@
 import codecs
-import functools
 from io import BytesIO
 import json
 import mimetypes
@@ -9,6 +8,9 @@ from typing import Any, Awaitable, ByteString, Callable, Iterable, Literal, NotR
 
 ASGIHeaders = Iterable[tuple[ByteString, ByteString]]
 
+_JSON_MIME_TYPES = frozenset({ "application/json" })
+_DECODER_CACHE: dict[str, Callable] = {}
+
 class ASGIScopeBase(TypedDict):
   asgi: dict[Literal["version", "spec_version"], str]
   state: NotRequired[dict[str,Any]]
@@ -43,10 +45,14 @@ ASGIHandler = Callable[[ASGIScope, ASGIFnReceive, ASGIFnSend], Awaitable[Any]]
 
 
 class TransportContext:
+  __slots__ = ("_scope", "_receive", "_send", "_headers", "_content_type")
+
   def __init__(self, scope: TransportScope, receive: ASGIFnReceive, send: ASGIFnSend) -> None:
     self._scope = scope
     self._receive = receive
     self._send = send
+    self._headers: dict[str, list[str]] | None = None
+    self._content_type: tuple[str, dict[str, str]] | None = None
 
   @property
   def path(self): return self._scope["path"]
@@ -56,15 +62,27 @@ class TransportContext:
   def fullpath(self): return (self._scope["raw_path"] or b"").decode("utf-8").split("&", 1)[0]
   @property
   def scope(self) -> TransportScope: return { **self._scope }
-  @functools.cached_property
+  @property
   def headers(self):
+    headers = self._headers
+    if headers is None: headers = self._headers = self._build_headers()
+    return headers
+  def _build_headers(self):
+    # ASGI headers are latin-1 encoded and usually already lowercase, single-valued
     res: dict[str, list[str]] = {}
     for k, v in self._scope["headers"]:
-      key = k.decode(errors="ignore").lower()
-      res[key] = res.get(key, []) + [v.decode(errors="ignore")] # TODO improve this...
+      key = k.decode("latin-1")
+      if not key.islower(): key = key.lower()
+      values = res.get(key)
+      if values is None: res[key] = [v.decode("latin-1")]
+      else: values.append(v.decode("latin-1"))
     return res
-  @functools.cached_property
+  @property
   def content_type(self):
+    content_type = self._content_type
+    if content_type is None: content_type = self._content_type = self._build_content_type()
+    return content_type
+  def _build_content_type(self):
     ct = self.headers.get("content-type", None)
     if ct is None or len(ct) == 0: raise ValueError("No content type specified on request!")
     if len(ct) > 1: raise ValueError("More than one content-type was specified!")
@@ -78,6 +96,8 @@ class TransportContext:
   async def _wreceive(self) -> dict: return await self._receive()
 
 class WebsocketContext(TransportContext):
+  __slots__ = ("_connected", "_accepted", "_add_accept_headers")
+
   close_reasons = {
     1000: 'Normal Closure', 1001: 'Going Away', 1002: 'Protocol Error',
     1003: 'Unsupported Data', 1004: 'Reserved', 1005: 'No Status Rcvd',
@@ -176,9 +196,10 @@ class HTTPBodyReader:
   def ended(self): return self._ended
 
   async def read_all(self):
-    body = BytesIO()
-    while not self._ended: body.write(await self.read())
-    return body.getvalue()
+    chunks: list[bytes] = []
+    while not self._ended: chunks.append(await self.read())
+    if len(chunks) == 1: return chunks[0] # common case: the body arrives in one request event
+    return b"".join(chunks)
 
   async def read(self):
     event = await self._receive()
@@ -190,12 +211,15 @@ class HTTPBodyReader:
     return b""
 
 class HTTPContext(TransportContext):
+  __slots__ = ("_connected", "_more_request_body", "_more_response_body", "_add_response_headers", "_body")
+
   def __init__(self, scope: HTTPScope, receive: ASGIFnReceive, send: ASGIFnSend) -> None:
     super().__init__(scope, receive, send)
     self._connected: bool = True
     self._more_request_body: bool = True
     self._more_response_body: bool = True
     self._add_response_headers: list[tuple[ByteString, ByteString]] = []
+    self._body: HTTPBodyReader | None = None
     self._scope: HTTPScope
 
   @property
@@ -206,8 +230,11 @@ class HTTPContext(TransportContext):
   def more_response_body(self): return self._more_response_body
   @property
   def method(self): return self._scope["method"]
-  @functools.cached_property
-  def body(self): return HTTPBodyReader(self._wreceive)
+  @property
+  def body(self):
+    body = self._body
+    if body is None: body = self._body = HTTPBodyReader(self._wreceive)
+    return body
 
   def add_response_headers(self, headers: ASGIHeaders): self._add_response_headers.extend(headers)
 
@@ -226,17 +253,25 @@ class HTTPContext(TransportContext):
     ])
     writer.write(content)
     await writer.close()
-  async def respond_file(self, path: str | pathlib.Path, status: int = 200, mime_type: str | None = None, buffer_size: int = -1):
+  async def respond_file(self, path: str | pathlib.Path, status: int = 200, mime_type: str | None = None, buffer_size: int = 262144):
     buffer_size = int(buffer_size)
     st = os.stat(path)
     mime_type = mime_type or mimetypes.guess_type(path)[0]
     if mime_type is None: raise ValueError("Unknown mime type!")
 
     content_type = mime_type
-    writer = await self.respond(status, headers=[
+    headers = [
       (b"content-length", str(st.st_size).encode("utf-8")),
       (b"content-type", content_type.encode("utf-8"))
-    ])
+    ]
+
+    extensions = self._scope.get("extensions", None)
+    if extensions is not None and "http.response.pathsend" in extensions:
+      # let the server hand the file to the kernel instead of copying through python
+      await self.respond(status, headers=headers)
+      return await self._wsend({ "type": "http.response.pathsend", "path": str(path) })
+
+    writer = await self.respond(status, headers=headers)
 
     with open(path, "rb") as fd:
       while len(buf := fd.read(buffer_size)) == buffer_size:
@@ -254,15 +289,18 @@ class HTTPContext(TransportContext):
     return HTTPBodyWriter(self._wsend)
 
   async def receive_json(self): return json.loads(await self.receive_json_raw())
-  async def receive_json_raw(self): return await self.receive_text({ "application/json" })
+  async def receive_json_raw(self): return await self.receive_text(_JSON_MIME_TYPES)
   async def receive_text(self, allowed_mime_types: Iterable[str]):
-    allowed_mime_types = allowed_mime_types if isinstance(allowed_mime_types, set) else set(allowed_mime_types)
+    allowed_mime_types = allowed_mime_types if isinstance(allowed_mime_types, (set, frozenset)) else set(allowed_mime_types)
     mime_type, ct_params = self.content_type
     if mime_type not in allowed_mime_types: raise ValueError(f"Mime type '{mime_type}' is not in allowed types!")
     charset = ct_params.get("charset", "utf-8")
-    try: decoder = codecs.getdecoder(charset)
-    except LookupError: raise ValueError("Invalid content-type encoding!")
     data = await self.body.read_all()
+    if charset == "utf-8": return data.decode("utf-8", "ignore")
+    decoder = _DECODER_CACHE.get(charset)
+    if decoder is None:
+      try: decoder = _DECODER_CACHE[charset] = codecs.getdecoder(charset)
+      except LookupError: raise ValueError("Invalid content-type encoding!")
     return decoder(data, "ignore")[0]
 
   async def _wsend(self, event: dict):
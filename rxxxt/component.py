@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
-import base64
+import binascii
 import inspect
 import json
+from types import CoroutineType
 from typing import Annotated, Any, Awaitable, Callable, Generic, ParamSpec, TypeVar, get_args, get_origin
 import weakref
 from pydantic import BaseModel, Field, create_model
@@ -9,7 +10,6 @@ from pydantic_core import PydanticUndefined
 
 from rxxxt.elements import CustomAttribute, Element, El
 from rxxxt.execution import Context
-from rxxxt.helpers import to_awaitable
 from rxxxt.state import StateBase, get_state_infos_for_object_type
 
 EHP = ParamSpec('EHP')
@@ -20,24 +20,76 @@ class EventHandlerOptions(BaseModel):
   throttle: int | None = None
   prevent_default: bool = False
 
+_fn_spec_cache: weakref.WeakKeyDictionary[Callable, tuple[type[BaseModel], dict[int, str], dict[str, str]]] = weakref.WeakKeyDictionary()
+
+def _get_function_specs(fn: Callable):
+  specs = _fn_spec_cache.get(fn, None)
+  if specs is None: specs = _fn_spec_cache[fn] = _build_function_specs(fn)
+  return specs
+
+def _build_function_specs(fn: Callable):
+  fields: dict[str, tuple[type, Field]] = {}
+  args_map: dict[int, str] = {}
+  param_map: dict[str, str] = {}
+
+  sig = inspect.signature(fn)
+
+  for i, (name, param) in enumerate(sig.parameters.items()):
+    if i == 0: continue # skip self
+
+    if get_origin(param.annotation) is Annotated:
+      args = get_args(param.annotation)
+      main_type = args[0]
+      metadata = args[1:]
+
+      if len(metadata) < 1:
+        raise ValueError(f"Parameter '{name}' is missing the second annotation.")
+
+      field_default = PydanticUndefined if param.default is param.empty else param.default
+      fields[name] = (main_type, Field(description=metadata[0], default=field_default))
+      args_map[i] = name
+      param_map[name] = metadata[0]
+    else:
+      raise TypeError(f"Parameter '{name}' must be of type Annotated.")
+
+  model: BaseModel = create_model(f"{fn.__name__}Model", **fields)
+  return model, args_map, param_map
+
 class ClassEventHandler(Generic[EHP, EHR]):
   def __init__(self, fn:  Callable[EHP, EHR], options: EventHandlerOptions) -> None:
     self.fn = fn
     self.options = options
-  def __get__(self, instance, owner): return InstanceEventHandler(self.fn, self.options, instance)
+    self._specs = _get_function_specs(fn) # built once at class definition time
+    # everything except the context id is fixed per handler function
+    self._payload_suffix = ("," + json.dumps({
+      "handler_name": fn.__name__,
+      "param_map": self._specs[2],
+      "options": options.model_dump(exclude_defaults=True)
+    }, separators=(",", ":"))[1:]).encode("utf-8")
+    self._name: str | None = None
+  def __set_name__(self, owner, name): self._name = name
+  def __get__(self, instance, owner):
+    if instance is None: return self
+    # stash the bound handler in the instance dict - this is a non-data descriptor,
+    # so subsequent lookups bypass __get__ entirely
+    if self._name is None: return InstanceEventHandler(self.fn, self.options, instance)
+    handler = instance.__dict__.get(self._name, None)
+    if handler is None: handler = instance.__dict__[self._name] = InstanceEventHandler(self.fn, self.options, instance)
+    return handler
   def __call__(self, *args: EHP.args, **kwargs: EHP.kwargs) -> EHR: raise RuntimeError("The event handler can only be called when attached to an instance!")
 
 class InstanceEventHandler(ClassEventHandler, Generic[EHP, EHR], CustomAttribute):
-  _fn_spec_cache: weakref.WeakKeyDictionary[Callable, tuple[BaseModel, dict[int, str], dict[str, str]]] = weakref.WeakKeyDictionary()
   _valid_types = (str, float, int, bool)
 
   def __init__(self, fn: Callable[EHP, EHR], options: EventHandlerOptions, instance: Any) -> None:
     super().__init__(fn, options)
     if not isinstance(instance, Component): raise ValueError("The provided instance must be a component!")
     self.instance = instance
+    self._kv_cache: dict[str, tuple[str, str]] = {}
+    self._kv_cache_context_id: str | None = None
 
   def __call__(self, *args: EHP.args, **kwargs: EHP.kwargs) -> EHR:
-    model, arg_map, _ = self._get_function_specs()
+    model, arg_map, _ = self._specs
     params = {**kwargs}
     for i, arg in enumerate(args):
       i = i + 1
@@ -51,47 +103,16 @@ class InstanceEventHandler(ClassEventHandler, Generic[EHP, EHR], CustomAttribute
   def get_html_attribute_key_value(self, original_key: str):
     if not original_key.startswith("on"): raise ValueError("Event handler must be applied to an attribute starting with 'on'.")
     if self.instance.context is None: raise ValueError("The instance must have a context_id to create an event value.")
-    _, _, param_map = self._get_function_specs()
-    v = base64.b64encode(json.dumps({
-      "context_id": self.instance.context.id,
-      "handler_name": self.fn.__name__,
-      "param_map": param_map,
-      "options": self.options.model_dump(exclude_defaults=True)
-    }).encode("utf-8")).decode("utf-8")
-    return (f"rxxxt-on-{original_key[2:]}", v)
-
-  def _get_function_specs(self):
-    specs = InstanceEventHandler._fn_spec_cache.get(self.fn, None)
-    if specs is not None: return specs
-
-    fields: dict[str, tuple[type, Field]] = {}
-    args_map: dict[int, str] = {}
-    param_map: dict[str, str] = {}
-
-    sig = inspect.signature(self.fn)
-
-    for i, (name, param) in enumerate(sig.parameters.items()):
-      if i == 0: continue # skip self
-
-      if get_origin(param.annotation) is Annotated:
-        args = get_args(param.annotation)
-        main_type = args[0]
-        metadata = args[1:]
-
-        if len(metadata) < 1:
-          raise ValueError(f"Parameter '{name}' is missing the second annotation.")
-
-        field_default = PydanticUndefined if param.default is param.empty else param.default
-        fields[name] = (main_type, Field(description=metadata[0], default=field_default))
-        args_map[i] = name
-        param_map[name] = metadata[0]
-      else:
-        raise TypeError(f"Parameter '{name}' must be of type Annotated.")
-
-    model: BaseModel = create_model(f"{self.fn.__name__}Model", **fields)
-    spec = model, args_map, param_map
-    InstanceEventHandler._fn_spec_cache[self.fn] = spec
-    return spec
+    # the rendered attribute only depends on the attribute key and the context id
+    context_id = self.instance.context.id
+    if context_id != self._kv_cache_context_id:
+      self._kv_cache.clear()
+      self._kv_cache_context_id = context_id
+    cached = self._kv_cache.get(original_key, None)
+    if cached is not None: return cached
+    payload = b"{\"context_id\":" + json.dumps(context_id).encode("utf-8") + self._payload_suffix
+    result = self._kv_cache[original_key] = (f"rxxxt-on-{original_key[2:]}", binascii.b2a_base64(payload, newline=False).decode("ascii"))
+    return result
 
 def event_handler(**kwargs):
   options = EventHandlerOptions.model_validate(kwargs)
@@ -122,14 +143,17 @@ class Component(Element, ABC):
     for state_info in get_state_infos_for_object_type(self.__class__):
       self.__dict__[state_info.attr_name] = await self.context.get_state(state_info.state_name, state_info.state_factory, state_info.is_global)
 
-    await to_awaitable(self.init)
+    # most inits and handlers are synchronous - only await when one actually returns a coroutine
+    result = self.init()
+    if result is not None and (type(result) is CoroutineType or inspect.isawaitable(result)): await result
 
     # events
 
     for e in self.context.get_events():
       handler = getattr(self, e.handler_name, None)
       if isinstance(handler, InstanceEventHandler):
-        await to_awaitable(handler, **e.data)
+        result = handler(**e.data)
+        if type(result) is CoroutineType or inspect.isawaitable(result): await result
       else:
         raise ValueError("Invalid event handler.")
 
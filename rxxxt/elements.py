@@ -1,92 +1,148 @@
 from abc import ABC, abstractmethod
+import functools
 import html
 from typing import TYPE_CHECKING, Protocol
 
 if TYPE_CHECKING:
     from rxxxt.execution import Context
 
+@functools.lru_cache(maxsize=1024)
+def _escape_name(name: str) -> str:
+  # tags and attribute keys come from a small fixed vocabulary
+  return html.escape(name)
+
+@functools.lru_cache(maxsize=1024)
+def _tag_markup(tag: str) -> tuple[str, str]:
+  # elements are rebuilt every render, so the opening prefix and closing tag are cached per tag, not per instance
+  name = _escape_name(tag)
+  return f"<{name}", f"</{name}>"
+
+def _escape_text(text: object) -> str:
+  if type(text) is not str: text = str(text)
+  # most content strings are plain labels - skip the escape translation entirely
+  if "&" not in text and "<" not in text and ">" not in text: return text
+  return html.escape(text, quote=False)
+
 class CustomAttribute(ABC):
+  __slots__ = ()
+
   @abstractmethod
   def get_html_attribute_key_value(self, original_key: str) -> tuple[str, str]: pass
 
 class Element(ABC):
+  __slots__ = ()
+
   @abstractmethod
   async def to_html(self, context: 'Context') -> str: pass
 
+  async def write_html(self, context: 'Context', out: list[str]) -> None:
+    out.append(await self.to_html(context))
+
 class UnescapedHTMLElement(Element):
+  __slots__ = ("text",)
+
   def __init__(self, text: str) -> None:
     super().__init__()
     self.text = text
   async def to_html(self, context: 'Context') -> str: return self.text
+  async def write_html(self, context: 'Context', out: list[str]) -> None: out.append(self.text)
 
 class HTMLFragment(Element):
+  __slots__ = ("key", "content")
+
   def __init__(self, content: list[Element | str], key: str | None = None) -> None:
     super().__init__()
     self.key = key
     self.content = content
 
   async def to_html(self, context: 'Context') -> str:
+    parts: list[str] = []
+    await self.write_html(context, parts)
+    return "".join(parts)
+
+  async def write_html(self, context: 'Context', out: list[str]) -> None:
     if self.key is not None:
       context = context.sub(self.key)
 
-    parts: list[str] = []
     for item in self.content:
-      if isinstance(item, Element): parts.append(await item.to_html(context))
-      else: parts.append(html.escape(str(item), quote=False))
-
-    return "".join(parts)
+      if isinstance(item, Element): await item.write_html(context, out)
+      else: out.append(_escape_text(item))
 
 class HTMLBaseElement(Element):
+  __slots__ = ("tag", "attributes", "_attributes_html")
+
   def __init__(self, tag: str, attributes: dict[str, str | CustomAttribute | None]) -> None:
     super().__init__()
     self.tag = tag
     self.attributes = attributes
+    self._attributes_html: str | None = None
 
   def _render_attributes(self):
+    attributes_html = self._attributes_html
+    if attributes_html is not None: return attributes_html
+    # attributes without a CustomAttribute render the same every time - detect that in the same pass
     parts: list[str] = []
+    cacheable = True
     for k, v in self.attributes.items():
-      if isinstance(v, CustomAttribute): k, v = v.get_html_attribute_key_value(k)
-      k = html.escape(str(k))
-      if v is not None: v = html.escape(str(v))
+      if isinstance(v, CustomAttribute):
+        cacheable = False
+        k, v = v.get_html_attribute_key_value(k)
+      k = _escape_name(str(k))
       if v is None: parts.append(f" {k}")
-      else: parts.append(f" {k}=\"{v}\"")
-    return "".join(parts)
+      else: parts.append(f" {k}=\"{html.escape(str(v))}\"")
+    attributes_html = "".join(parts)
+    if cacheable: self._attributes_html = attributes_html
+    return attributes_html
 
 class HTMLVoidElement(HTMLBaseElement):
+  __slots__ = ()
+
   async def to_html(self, context: 'Context') -> str:
-    return f"<{html.escape(self.tag)}{self._render_attributes()}>"
+    return _tag_markup(self.tag)[0] + self._render_attributes() + ">"
 
 class HTMLElement(HTMLBaseElement):
+  __slots__ = ("key", "content")
+
   def __init__(self, tag: str, attributes: dict[str, str | CustomAttribute | None] = {}, content: list[Element | str] = [], key: str | None = None) -> None:
     super().__init__(tag, attributes)
     self.key = key
     self.content = content
 
   async def to_html(self, context: 'Context') -> str:
+    parts: list[str] = []
+    await self.write_html(context, parts)
+    return "".join(parts)
+
+  async def write_html(self, context: 'Context', out: list[str]) -> None:
     if self.key is not None:
       context = context.sub(self.key)
 
-    parts: list[str] = []
+    open_prefix, close = _tag_markup(self.tag)
+    out.append(open_prefix + self._render_attributes() + ">")
     for item in self.content:
-      if isinstance(item, Element): parts.append(await item.to_html(context))
-      else: parts.append(html.escape(str(item), quote=False))
-
-    inner_html = "".join(parts)
-    tag = html.escape(self.tag)
-    return f"<{tag}{self._render_attributes()}>{inner_html}</{tag}>"
+      if isinstance(item, Element): await item.write_html(context, out)
+      else: out.append(_escape_text(item))
+    out.append(close)
 
 class RenderedElement(Element, ABC):
+  __slots__ = ()
+
   @abstractmethod
   def render(self) -> Element: pass
   async def to_html(self, context: 'Context') -> str: return await self.render().to_html(context)
+  async def write_html(self, context: 'Context', out: list[str]) -> None: await self.render().write_html(context, out)
 
 class CreateHTMLElement(Protocol):
   def __call__(self, content: list[Element | str] = [], **kwargs: str | CustomAttribute | None) -> HTMLElement: ...
 
 class _El(type):
+  # cache the factory per tag so El.div does not allocate a closure on every access
+  @functools.lru_cache(maxsize=None)
   def __getitem__(cls, name: str) -> CreateHTMLElement:
     def _inner(content: list[Element | str] = [], **kwargs: str | CustomAttribute | None):
-      return HTMLElement(name, attributes={ k.lstrip("_"): v for k,v in kwargs.items() }, content=content)
+      # kwargs is a fresh dict per call - only rebuild it when a key actually needs renaming
+      if any(k[0] == "_" for k in kwargs): kwargs = { k.lstrip("_"): v for k, v in kwargs.items() }
+      return HTMLElement(name, attributes=kwargs, content=content)
     return _inner
   def __getattribute__(cls, name: str): return cls[name]
 
@@ -96,9 +152,11 @@ class CreateHTMLVoidElement(Protocol):
   def __call__(self, **kwargs: str | CustomAttribute | None) -> HTMLVoidElement: ...
 
 class _VEl(type):
+  @functools.lru_cache(maxsize=None)
   def __getitem__(cls, name: str) -> CreateHTMLVoidElement:
     def _inner(**kwargs: str | CustomAttribute | None) -> HTMLVoidElement:
-      return HTMLVoidElement(name, attributes={ k.lstrip("_"): v for k,v in kwargs.items() })
+      if any(k[0] == "_" for k in kwargs): kwargs = { k.lstrip("_"): v for k, v in kwargs.items() }
+      return HTMLVoidElement(name, attributes=kwargs)
     return _inner
   def __getattribute__(cls, name: str): return cls[name]
 
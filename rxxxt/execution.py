@@ -1,9 +1,11 @@
-import base64
+import binascii
+from collections import defaultdict, deque
 from dataclasses import dataclass
 from datetime import datetime
 import functools
 import hashlib
 import re
+import sys
 import asyncio
 from typing import Literal
 from pydantic import BaseModel, field_serializer, field_validator
@@ -13,6 +15,24 @@ from rxxxt.helpers import to_awaitable
 from rxxxt.state import StateBase, StateFactory
 
 
+_B64_URLSAFE_TRANS = bytes.maketrans(b"+/", b"-_")
+
+_COOKIE_NAME_RE = re.compile(r'\A[^=;, \t\n\r\f\v]+\Z')
+_COOKIE_VALUE_RE = re.compile(r'\A[^;, \t\n\r\f\v]+\Z')
+_COOKIE_PATH_RE = re.compile(r'\A[^\x00-\x20;,\s]+\Z')
+@functools.lru_cache(maxsize=1024)
+def _parse_cookie_header(header: str) -> dict[str, str]:
+  # single forward scan - no substring list, and only the key slice gets stripped
+  result: dict[str, str] = {}
+  pos, n = 0, len(header)
+  while pos < n:
+    semi = header.find(";", pos)
+    if semi == -1: semi = n
+    eq = header.find("=", pos, semi)
+    if eq != -1: result[header[pos:eq].strip()] = header[eq + 1:semi]
+    pos = semi + 1
+  return result
+
 def validate_key(key: str):
   if ";" in key: raise ValueError("Key must not contain a semicolon.")
   if "!" in key: raise ValueError("Key must not contain an exclamation mark.")
@@ -37,21 +57,21 @@ class SetCookieOutputEvent(BaseModel):
   @field_validator('name')
   @classmethod
   def validate_name(cls, value: str):
-    if not re.match(r'^[^=;, \t\n\r\f\v]+$', value): raise ValueError("Invalid cookie name")
+    if not _COOKIE_NAME_RE.match(value): raise ValueError("Invalid cookie name")
     return value
 
   @field_validator('value', "domain")
   @classmethod
   def validate_value(cls, value: str | None):
     if value is None: return None
-    if not re.match(r'^[^;, \t\n\r\f\v]+$', value): raise ValueError("Invalid value.")
+    if not _COOKIE_VALUE_RE.match(value): raise ValueError("Invalid value.")
     return value
 
   @field_validator('path')
   @classmethod
   def validate_path(cls, value: str | None):
     if value is None: return None
-    if not re.match(r'^[^\x00-\x20;,\s]+$', value): raise ValueError("Invalid path value")
+    if not _COOKIE_PATH_RE.match(value): raise ValueError("Invalid path value")
     return value
 
   @field_serializer('expires', when_used='json')
@@ -96,13 +116,7 @@ class AppExecutor:
   def cookies(self) -> dict[str, str]:
     values = self.headers.get("cookie", [])
     if len(values) == 0: return {}
-    result: dict[str, str] = {}
-    for cookie in values[0].split(";"):
-      try:
-        eq_idx = cookie.index("=")
-        result[cookie[:eq_idx]] = cookie[(eq_idx + 1):]
-      except ValueError: pass
-    return result
+    return _parse_cookie_header(values[0])
 
   async def execute_root(self, root_key: str, element: 'Element', exec_input: ExecutionInput):
     execution = AppExecution(self, exec_input)
@@ -111,10 +125,13 @@ class AppExecutor:
   async def execute_partial(self, execution: 'AppExecution'):
     context_ids = set(event.context_id for event in execution.execution_input.events) # TODO handle changed states as well
     roots = execution.prepare_roots(context_ids)
+    if len(roots) == 1: # typical updates touch one context - skip the gather/Task machinery
+      context_id, root = roots[0]
+      return [ await root.to_html(Context(context_id, execution)) ]
     return await asyncio.gather(*(root.to_html(Context(context_id, execution)) for context_id, root in roots))
 
   async def get_state(self, name: str, context: 'Context', state_factory: StateFactory):
-    key = context.id + "!" + name
+    key = sys.intern(context.id + "!" + name)
     if key in self._state:
       state = self._state[key]
     elif key in self._raw_state:
@@ -128,51 +145,74 @@ class AppExecutor:
 
   def get_raw_state(self): return { k: v.to_json() for k, v in self._state.items() }
 
+  def has_state_changes(self):
+    # states missing from the raw input (fresh defaults) count as changed
+    return any(state.to_json() != self._raw_state.get(key, None) for key, state in self._state.items())
+
 class AppExecution:
   def __init__(self, executor: AppExecutor, input_data: ExecutionInput) -> None:
     self.executor = executor
     self.execution_input = input_data
-    self.output_events: list[ExecutionOutputEvent] = []
+    self.output_events: deque[ExecutionOutputEvent] = deque()
 
-    self.state_users: dict[StateBase, list[str]] = {}
+    self.state_users: dict[StateBase, set[str]] = {}
 
     self.context_elements: dict[str, Element] = {}
     self._context_parents: dict[str, str] = {}
+    self._context_children: defaultdict[str, list[str]] = defaultdict(list)
     self._unique_ids: set[str] = set()
+    self._duplicate_id_hints: dict[str, str] = {} # base id -> last id issued for it
+
+    # index events once so per-component lookup is O(1) instead of a scan per context
+    self._input_events: defaultdict[str, list[ContextInputEvent]] = defaultdict(list)
+    for event in input_data.events: self._input_events[event.context_id].append(event)
 
   def get_context_id(self, parent_id: str, suffix: str):
-    ctx_id = AppExecution.get_hashed_id(parent_id + ";" + suffix)
-    while ctx_id in self._unique_ids: ctx_id = AppExecution.get_hashed_id(ctx_id + "#")
+    base_id = _base_context_id(parent_id, suffix)
+    # resume the rehash chain at the last issued id so n same-keyed siblings cost O(n), not O(n^2)
+    ctx_id = self._duplicate_id_hints.get(base_id, base_id)
+    while ctx_id in self._unique_ids: ctx_id = sys.intern(AppExecution.get_hashed_id(ctx_id + "#"))
+    if ctx_id is not base_id: self._duplicate_id_hints[base_id] = ctx_id
     self._unique_ids.add(ctx_id)
     self._context_parents[ctx_id] = parent_id
+    self._context_children[parent_id].append(ctx_id)
     return ctx_id
 
-  def get_context_events(self, context_id: str): return (e for e in self.execution_input.events if e.context_id == context_id)
+  def get_context_events(self, context_id: str): return self._input_events.get(context_id, ())
 
   def prepare_roots(self, context_ids: set[str]):
+    self._duplicate_id_hints.clear() # freed ids invalidate the resume hints
     root_ids = self._get_context_roots(context_ids)
     context_children = self._get_context_children(root_ids)
 
     for child_id in context_children:
       self._context_parents.pop(child_id, None)
+      self._context_children.pop(child_id, None)
       self.context_elements.pop(child_id, None)
+    # every direct child of a re-rendered root is pruned above and re-registers on render
+    for root_id in root_ids: self._context_children.pop(root_id, None)
 
     self._unique_ids.difference_update(context_children)
-    self.state_users = { state: [u for u in users if u not in context_children] for state, users in self.state_users.items() }
+    for users in self.state_users.values(): users.difference_update(context_children)
     return [ (root_id, self.context_elements[root_id]) for root_id in root_ids ] # NOTE: all roots should be tracked
 
   def _get_context_roots(self, context_ids: set[str]):
-    return set(context_id for context_id in context_ids if all(parent not in context_ids for parent in self._get_context_parents(context_id)))
+    get_parent = self._context_parents.get
+    roots: set[str] = set()
+    for context_id in context_ids:
+      parent_id = get_parent(context_id)
+      while parent_id is not None and parent_id not in context_ids: parent_id = get_parent(parent_id)
+      if parent_id is None: roots.add(context_id)
+    return roots
 
   def _get_context_children(self, context_ids: set[str]):
-      context_children: dict[str, list[str]] = {}
-      for c, p in self._context_parents: context_children.setdefault(p, []).append(c)
+      get_children = self._context_children.get
       total = set(context_ids)
       current = set(context_ids)
 
       while len(current) > 0:
         new_current = set()
-        for ctx_id in (ctx_id for par_id in current for ctx_id in context_children.get(par_id, [])):
+        for ctx_id in (ctx_id for par_id in current for ctx_id in get_children(par_id, ())):
           if not ctx_id in total: new_current.add(ctx_id)
         total.update(new_current)
         current = new_current
@@ -180,18 +220,41 @@ class AppExecution:
       total.difference_update(context_ids)
       return total
 
-  def _get_context_parents(self, context_id: str):
-    parent_id = context_id
-    while (parent_id := self._context_parents.get(parent_id)) is not None: yield parent_id
-
   @staticmethod
-  def get_hashed_id(raw: str): return base64.urlsafe_b64encode(hashlib.sha256(raw.encode("utf-8")).digest()).decode("utf-8")
+  def get_hashed_id(raw: str):
+    # b2a_base64 + translate skips the validation in base64.urlsafe_b64encode; output is identical
+    return binascii.b2a_base64(hashlib.blake2b(raw.encode("utf-8"), digest_size=20).digest(), newline=False).translate(_B64_URLSAFE_TRANS).decode("ascii")
+
+_base_context_id_cache: dict[tuple[str, str], str] = {}
+
+def _base_context_id(parent_id: str, suffix: str) -> str:
+  # context ids repeat across requests, so the (parent, key) hash is worth caching;
+  # a plain dict with clear-on-full beats lru_cache's per-hit bookkeeping
+  key = (parent_id, suffix)
+  ctx_id = _base_context_id_cache.get(key, None)
+  if ctx_id is None:
+    if len(_base_context_id_cache) >= 4096: _base_context_id_cache.clear()
+    ctx_id = _base_context_id_cache[key] = sys.intern(AppExecution.get_hashed_id(parent_id + ";" + suffix))
+  return ctx_id
 
 class Context:
+  __slots__ = ("_id", "_parent", "_key", "execution")
+
   def __init__(self, id: str, execution: AppExecution) -> None:
-    self.id = id
+    self._id: str | None = id
+    self._parent: 'Context | None' = None
+    self._key: str | None = None
     self.execution = execution
 
+  @property
+  def id(self) -> str:
+    # most keyed sub-contexts never need their id - only compute (and register) it on first use
+    ctx_id = self._id
+    if ctx_id is None:
+      ctx_id = self._id = self.execution.get_context_id(self._parent.id, self._key)
+      self._parent = self._key = None
+    return ctx_id
+
   @property
   def query_string(self): return self.execution.execution_input.query_string
 
@@ -206,7 +269,7 @@ class Context:
   async def get_state(self, name: str, state_factory: StateFactory, is_global: bool = False):
     context = Context("", self.execution) if is_global else self
     state = await self.execution.executor.get_state(name, context, state_factory)
-    self.execution.state_users.setdefault(state, []).append(self.id)
+    self.execution.state_users.setdefault(state, set()).add(self.id)
     return state
 
   def navigate(self, location: str): self.execution.output_events.append(NavigateOutputEvent(location=location))
@@ -225,4 +288,7 @@ class Context:
 
   def sub(self, key: str) -> 'Context':
     validate_key(key)
-    return Context(id=self.execution.get_context_id(self.id, key), execution=self.execution)
+    context = Context(id=None, execution=self.execution)
+    context._parent = self
+    context._key = key
+    return context
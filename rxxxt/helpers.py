@@ -1,5 +1,6 @@
 from inspect import isawaitable
 import re
+from types import CoroutineType
 from typing import Awaitable, Callable, TypeVar
 
 class PathPattern:
@@ -33,35 +34,28 @@ class PathPattern:
     for part in self.parts:
       if "}" in part: raise ValueError("Invalid pattern. Found closing brace without an opening brace.")
 
-  def match(self, path: str) -> dict[str,str] | None:
-    # path = path.rstrip("/")
-    if len(self.parts) == 1:
-      return {} if path == self.parts[0] else None
-
-    params: dict[str, str] = {}
-    current_index = 0
-    for idx in range(0, len(self.parts) - 1):
-      part1 = self.parts[idx]
-      part2 = self.parts[idx + 1]
-      param_name, param_allow_slash = self.params[idx]
+    self._regex = re.compile(self.as_regex())
 
-      part1_len = len(part1)
-      if path[current_index:current_index + part1_len] != part1: return None
+  def as_regex(self) -> str:
+    if len(self.parts) == 1: return re.escape(self.parts[0]) + "$"
+    out: list[str] = []
+    last_param_idx = len(self.parts) - 2
+    for idx in range(len(self.parts) - 1):
+      out.append(re.escape(self.parts[idx]))
+      _, param_allow_slash = self.params[idx]
+      if idx == last_param_idx and self.parts[idx + 1] == "": out.append("(.*)$" if param_allow_slash else "([^/]*)$")
+      else: out.append("(.*?)" if param_allow_slash else "([^/]*?)")
+    out.append(re.escape(self.parts[-1]))
+    return "".join(out)
 
-      current_index += part1_len
-      if part2 == "" and idx == len(self.parts) - 2:
-        param_val = path[current_index:]
-      else:
-        part2_start = path.find(part2, current_index)
-        if part2_start == -1: return None
-        param_val = path[current_index:part2_start]
-      current_index += len(param_val)
-      if "/" in param_val and not param_allow_slash: return None
-      if param_name is not None: params[param_name] = param_val
-    return params
+  def match(self, path: str) -> dict[str,str] | None:
+    m = self._regex.match(path)
+    if m is None: return None
+    return { name: value for (name, _), value in zip(self.params, m.groups()) if name is not None }
 
 T = TypeVar("T")
 async def to_awaitable(fn: Callable[..., T | Awaitable[T]], *args, **kwargs) -> T:
   result = fn(*args, **kwargs)
-  if isawaitable(result): result = await result
+  if type(result) is CoroutineType: result = await result # fast path for plain coroutine functions
+  elif isawaitable(result): result = await result
   return result
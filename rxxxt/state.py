@@ -2,8 +2,8 @@ from abc import ABC, abstractmethod
 import base64
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+import functools
 import hashlib
-from io import BytesIO
 import json
 import sys
 from typing import TYPE_CHECKING, Any, Awaitable, ByteString, Callable, Literal, get_type_hints
@@ -14,6 +14,8 @@ if TYPE_CHECKING:
   from rxxxt.execution import Context
 
 class StateBase(ABC):
+  __slots__ = ()
+
   def init(self, context: 'Context') -> None | Awaitable[None]: pass
 
   def __hash__(self) -> int: return id(self)
@@ -35,6 +37,8 @@ class State(StateBase, BaseModel):
     else: return cls.model_validate_json(json_data)
 
 class StateField(StateBase):
+  __slots__ = ("value",)
+
   def __init__(self, value: Any) -> None:
     super().__init__()
     self.value = value
@@ -71,7 +75,11 @@ def state_field(default_value: Any = None, default_facotry: None | Callable[[],
   return StateFieldInfo(default_value=default_value, default_facotry=default_facotry)
 def global_state(name: str | None = None): return PartialStateInfo(is_global=True, name=name)
 
-def get_state_infos_for_object_type(t: type[object]):
+@functools.lru_cache(maxsize=None)
+def get_state_infos_for_object_type(t: type[object]) -> tuple[StateInfo, ...]:
+  return tuple(_iter_state_infos_for_object_type(t))
+
+def _iter_state_infos_for_object_type(t: type[object]):
   global_ns = vars(sys.modules[t.__module__])
   for base_class in reversed(t.__mro__):
     type_hints = get_type_hints(base_class, globalns=global_ns)
@@ -135,18 +143,12 @@ class JWTStateResolver(StateResolver):
 
   def create_token(self, data: dict[str, str], _: str | None) -> str:
     payload = { "exp": int((datetime.now(tz=timezone.utc) + self.max_age).timestamp()), "data": compress_state(data) }
-    stream = BytesIO()
-    stream.write(JWTStateResolver.b64url_encode(json.dumps({
+    signing_input = JWTStateResolver.b64url_encode(json.dumps({
       "typ": "JWT",
       "alg": self.algorithm
-    }).encode("utf-8")))
-    stream.write(b".")
-    stream.write(JWTStateResolver.b64url_encode(json.dumps(payload).encode("utf-8")))
-
-    signature = hmac.digest(self.secret, stream.getvalue(), self.digest)
-    stream.write(b".")
-    stream.write(JWTStateResolver.b64url_encode(signature))
-    return stream.getvalue().decode("utf-8")
+    }).encode("utf-8")) + b"." + JWTStateResolver.b64url_encode(json.dumps(payload).encode("utf-8"))
+    signature = hmac.digest(self.secret, signing_input, self.digest)
+    return (signing_input + b"." + JWTStateResolver.b64url_encode(signature)).decode("utf-8")
 
   def resolve(self, token: str) -> dict[str, str] | Awaitable[dict[str, str]]:
     rtoken = token.encode("utf-8")